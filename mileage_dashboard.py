@@ -14,10 +14,21 @@ Run with:
     streamlit run mileage_dashboard.py
 """
 
+import concurrent.futures
+import hashlib
+import json
+import os
+import tempfile
 from pathlib import Path
 
+import matplotlib
+matplotlib.use("Agg")  # headless raster backend; no GUI event loop needed
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pacsv
+import requests
 import streamlit as st
 import io
 import xlsxwriter
@@ -32,6 +43,14 @@ DRIVER_SHEET_URLS = {
      "Theresa":"https://docs.google.com/spreadsheets/d/e/2PACX-1vRoqxBfrk20Hlb-foWIhLqBQwYDoYQzJ7XUKnScd5WjxM5XHr5MmBGECkCAh62oq3zXI3tMxkVLFgMP/pub?gid=0&single=true&output=csv",
 }
 
+# Internal underscore names -> user-facing headers; applied only at the
+# display/export boundary so internal code keeps one set of names.
+DISPLAY_RENAME = {
+    "Commute_Miles": "Commute Miles",
+    "Business_Miles": "Business Miles",
+    "Total_Miles": "Total Miles",
+}
+
 
 
 # ---------------------------
@@ -61,48 +80,130 @@ st.caption(f"Logged in as: {st.user.email}")
 # ---------------------------
 # Authorization (whitelist)
 # ---------------------------
-ALLOWED_EMAILS = {
+# Normalized once at import so case/whitespace variations in the identity
+# provider's email can't cause false negatives.
+ALLOWED_EMAILS = frozenset(e.lower().strip() for e in {
     "brandonkeithmarkham@gmail.com",
     "laura.miggins@gmail.com",
     "jasonlee091488@gmail.com",
     "elderwheelsatx@gmail.com",
     "elderewheelsoffice@gmail.com",
     "sacredrootsaustin@gmail.com"
-}
+})
 
-if st.user.email not in ALLOWED_EMAILS:
-    st.error("🚫 You are not authorized to access this application.")
-    st.stop()
+# Check once per session; later reruns take the session_state fast path.
+if "_authz_ok" not in st.session_state:
+    if (st.user.email or "").lower().strip() not in ALLOWED_EMAILS:
+        st.error("🚫 You are not authorized to access this application.")
+        st.stop()
+    st.session_state["_authz_ok"] = True
 
 
 
 # ---------------------------
 # Data loading using your code, but from Google Sheets
 # ---------------------------
+
+# Disk-backed cache for the sheet CSVs. Unlike st.cache_data this survives
+# process restarts; combined with conditional GETs it means unchanged sheets
+# cost a header-sized round trip instead of a full download.
+SHEET_CACHE_DIR = Path(".sheet_cache")
+
+
+def _cached_fetch(url: str, session) -> bytes:
+    """
+    Fetch `url`, revalidating against a local disk cache.
+
+    Stores the body in {SHEET_CACHE_DIR}/{sha1(url)}.csv and the validators
+    (ETag / Last-Modified) in a sibling .meta JSON file. Sends the validators
+    as If-None-Match / If-Modified-Since; a 304 response means the cached
+    bytes are still good and no body crosses the wire.
+    """
+    SHEET_CACHE_DIR.mkdir(exist_ok=True)
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    body_path = SHEET_CACHE_DIR / f"{key}.csv"
+    meta_path = SHEET_CACHE_DIR / f"{key}.meta"
+
+    headers = {}
+    if body_path.exists() and meta_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (ValueError, OSError):
+            meta = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    resp = session.get(url, headers=headers, timeout=10)
+
+    if resp.status_code == 304:
+        return body_path.read_bytes()
+
+    resp.raise_for_status()
+    body = resp.content
+
+    # Rewrite body + meta atomically so a crash mid-write can't leave a
+    # truncated cache entry behind.
+    for path, data in (
+        (body_path, body),
+        (meta_path, json.dumps({
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }).encode("utf-8")),
+    ):
+        fd, tmp_name = tempfile.mkstemp(dir=SHEET_CACHE_DIR)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+
+    return body
+
+
 @st.cache_data(ttl=300)  # cache 5 minutes to avoid hammering Google
 def load_data():
     """
     Load mileage data from the published Google Sheets for each driver,
     then reuse the existing mileage_process pipeline.
     """
-    frames = []
-    for driver_name, sheet_url in DRIVER_SHEET_URLS.items():
-        try:
-            tmp = pd.read_csv(sheet_url)
-        except Exception as e:
-            # If one sheet is broken, skip it but log a warning in the UI later
-            # You could also collect these errors in a list if you want.
-            continue
-        tmp.columns = tmp.columns.str.strip()    
-        # Tag each row with the driver name
-        tmp["Driver"] = driver_name
-        frames.append(tmp)
+    def _fetch(driver_name, sheet_url, session):
+        body = _cached_fetch(sheet_url, session)
+        # pyarrow's multithreaded CSV parser is considerably faster than
+        # pandas' C engine and skips the dtype-inference second pass.
+        table = pacsv.read_csv(io.BytesIO(body))
+        table = table.rename_columns([c.strip() for c in table.column_names])
+        # Tag each row with the driver name; dictionary-encoded so the
+        # column arrives in pandas as a category (cheap .isin later).
+        driver = pa.array([driver_name] * table.num_rows).dictionary_encode()
+        return table.append_column("Driver", driver)
+
+    # Fetch all sheets concurrently: each request is mostly network latency,
+    # so wall-clock becomes max(RTT) instead of sum(RTT). A shared Session
+    # reuses the TCP/TLS connection across drivers.
+    tables = []
+    with requests.Session() as session, concurrent.futures.ThreadPoolExecutor(
+        max_workers=len(DRIVER_SHEET_URLS)
+    ) as executor:
+        futures = [
+            executor.submit(_fetch, driver_name, sheet_url, session)
+            for driver_name, sheet_url in DRIVER_SHEET_URLS.items()
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                tables.append(future.result())
+            except Exception:
+                # If one sheet is broken, skip it but log a warning in the UI later
+                # You could also collect these errors in a list if you want.
+                continue
 
-    if not frames:
+    if not tables:
         raise SystemExit("No driver sheets could be loaded. Check DRIVER_SHEET_URLS.")
 
-    # Combine all driver sheets into one raw DataFrame
-    raw_df = pd.concat(frames, ignore_index=True)
+    # Combine all driver sheets zero-copy on the Arrow side, then convert
+    # to pandas exactly once — instead of N DataFrame allocations followed
+    # by a copying pd.concat.
+    combined = pa.concat_tables(tables, promote_options="permissive")
+    raw_df = combined.to_pandas()
 
     # Reuse your existing processing logic
     df = mp.load_and_prepare(raw_df)
@@ -116,12 +217,43 @@ def load_data():
 # ---------------------------
 # Build master Excel workbook (Summary + Details), like mileage_process.py
 # ---------------------------
-def build_master_excel(df: pd.DataFrame, summary: pd.DataFrame) -> io.BytesIO:
+# Export engine selector: set MILEAGE_EXCEL_ENGINE=polars to serialize the
+# workbook via polars' write_excel (notably faster on large Details sheets).
+# Anything else — or polars being unavailable — uses the xlsxwriter path.
+EXCEL_ENGINE = os.environ.get("MILEAGE_EXCEL_ENGINE", "xlsxwriter").lower()
+
+
+def _build_with_polars(summary_df: pd.DataFrame, details_df: pd.DataFrame) -> bytes:
+    """Serialize both sheets via polars into one xlsxwriter workbook."""
+    import polars as pl
+
+    # Note: no constant_memory here — polars writes worksheet tables via
+    # add_table(), which xlsxwriter doesn't support in that mode.
+    buffer = io.BytesIO()
+    with xlsxwriter.Workbook(buffer, {"strings_to_numbers": False}) as workbook:
+        for sheet_name, data in (("Summary", summary_df), ("Details", details_df)):
+            pl.from_pandas(data).write_excel(
+                workbook=workbook,
+                worksheet=sheet_name,
+                autofit=True,
+                freeze_panes=(1, 0),
+                header_format={"bold": True, "bg_color": "#FFFF99", "border": 1},
+            )
+    return buffer.getvalue()
+
+
+@st.cache_data(show_spinner=False)
+def build_master_excel(df: pd.DataFrame, summary: pd.DataFrame) -> bytes:
     """
     Create an in-memory Excel file with:
       - 'Summary' sheet: aggregated mileage by vehicle
       - 'Details' sheet: all prepared rows
 
+    Cached on the contents of both frames, so reruns triggered by filter
+    or sidebar interactions don't redo the xlsxwriter serialization.
+    Returns the raw .xlsx bytes (bytes hash cleanly for the cache;
+    BytesIO doesn't).
+
     Styling (via xlsxwriter):
       - Bold yellow header row
       - Borders around all cells
@@ -129,24 +261,26 @@ def build_master_excel(df: pd.DataFrame, summary: pd.DataFrame) -> io.BytesIO:
       - Frozen header row
     """
     # Rename columns for consistency with your reports
-    summary_export = summary.rename(
-        columns={
-            "Commute_Miles": "Commute Miles",
-            "Business_Miles": "Business Miles",
-            "Total_Miles": "Total Miles",
-        }
-    )
+    summary_export = summary.rename(columns=DISPLAY_RENAME)
+
+    # Details omits the internal bookkeeping columns (_is_commute, _row_ok);
+    # plain column selection, no copy — the frame is only read from here on.
+    details_df = df[[c for c in df.columns if not c.startswith("_")]]
+
+    if EXCEL_ENGINE == "polars":
+        try:
+            return _build_with_polars(summary_export.reset_index(), details_df)
+        except Exception:
+            # polars missing or write failed — fall back to xlsxwriter below
+            pass
 
     buffer = io.BytesIO()
 
-    # Use xlsxwriter engine
+    # No constant_memory: pandas' to_excel emits cells column by column,
+    # and that mode silently drops writes to rows it has already flushed,
+    # blanking everything past the first column of each sheet.
     with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-        # Write data first (let pandas handle NaNs etc.)
         summary_df = summary_export.reset_index()
-        details_df = df.copy()
-
-        summary_df.to_excel(writer, sheet_name="Summary", index=False)
-        details_df.to_excel(writer, sheet_name="Details", index=False)
 
         workbook = writer.book
 
@@ -156,45 +290,160 @@ def build_master_excel(df: pd.DataFrame, summary: pd.DataFrame) -> io.BytesIO:
         )
         cell_border = workbook.add_format({"border": 1})
 
-        # Helper to style a sheet
+        # Helper to style + write a sheet: the styled header row goes in
+        # first and pandas appends the data below it (header=False).
         def style_sheet(sheet_name: str, data: pd.DataFrame) -> None:
-            ws = writer.sheets[sheet_name]
-            n_rows, n_cols = data.shape
+            ws = workbook.add_worksheet(sheet_name)
 
             # Freeze header row
             ws.freeze_panes(1, 0)
 
-            # Header styling + column widths
+            # Header styling + column widths.
+            # Passing cell_border as the column default format borders every
+            # cell at write time — much cheaper than the previous pair of
+            # whole-sheet conditional_format rules, which Excel re-evaluates
+            # per cell on open.
             for col_idx, col_name in enumerate(data.columns):
-                # Overwrite header cell with styling
+                # Write the header cell with styling
                 ws.write(0, col_idx, col_name, header_format)
 
-                # Auto-fit: max length of header or any cell in this column
-                col_series = data[col_name].astype(str)
-                max_len = max(col_series.map(len).max() if not col_series.empty else 0,
-                              len(str(col_name)))
-                ws.set_column(col_idx, col_idx, max_len + 2)
-
-            # Apply borders to all used cells via conditional formatting
-            if n_cols > 0:
-                # rows 0..n_rows, cols 0..n_cols-1
-                ws.conditional_format(
-                    0, 0, n_rows, n_cols - 1,
-                    {"type": "no_blanks", "format": cell_border},
-                )
-                ws.conditional_format(
-                    0, 0, n_rows, n_cols - 1,
-                    {"type": "blanks", "format": cell_border},
-                )
-
-        # Style both sheets
+                # Auto-fit: max length of header or any cell in this column.
+                # .str.len() is a vectorized C path (vs. a Python len() call
+                # per row with .map) and handles missing values natively.
+                lens = data[col_name].astype("string").str.len()
+                max_cell_len = 0 if lens.isna().all() else int(lens.max())
+                max_len = max(max_cell_len, len(str(col_name)))
+                ws.set_column(col_idx, col_idx, max_len + 2, cell_border)
+
+            data.to_excel(
+                writer, sheet_name=sheet_name, index=False,
+                header=False, startrow=1,
+            )
+
+        # Style + write both sheets
         style_sheet("Summary", summary_df)
         style_sheet("Details", details_df)
 
-    buffer.seek(0)
-    return buffer
+    return buffer.getvalue()
+
+
+
 
+@st.cache_data(show_spinner=False)
+def _aggregate_filtered(df: pd.DataFrame, drivers_key: tuple) -> pd.DataFrame:
+    """
+    Aggregate by vehicle for the given driver selection.
+
+    Cached so toggling back to a previously seen selection (or reruns with
+    the same one) skips the groupby entirely; drivers_key is a sorted tuple
+    to make equal selections hash identically.
+    """
+    if drivers_key and "Driver" in df.columns:
+        df = df[df["Driver"].isin(drivers_key)]
+    return mp.aggregate_by_vehicle(df)
+
+
+# ---------------------------
+# Chart rendering (cached PNGs)
+# ---------------------------
+# Rendering Matplotlib figures on every Streamlit rerun is pure overhead
+# when the underlying numbers haven't changed. These helpers take plain
+# tuples (hashable cache keys), render once, and return PNG bytes that
+# main() can hand straight to st.image.
+
+@st.cache_data(show_spinner=False)
+def _bar_png(vehicles: tuple, totals: tuple) -> bytes:
+    """Render the total-miles bar chart to PNG bytes."""
+    fig, ax = plt.subplots()
+    ax.bar(vehicles, totals)
+    ax.set_ylabel("Miles")
+    ax.set_xlabel("Vehicle")
+    ax.set_title("Total Miles by Vehicle")
+    ax.tick_params(axis="x", rotation=30)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment("right")
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=100, bbox_inches="tight")
+    # pyplot keeps a global reference to every figure; close it so
+    # long-lived workers don't accumulate one per cache miss.
+    plt.close(fig)
+    return buf.getvalue()
+
+
+@st.cache_data(show_spinner=False)
+def _stacked_png(vehicles: tuple, business: tuple, commute: tuple) -> bytes:
+    """
+    Render a 100%-stacked horizontal bar chart (Business vs Commute share
+    per vehicle) to PNG bytes. One vectorized draw regardless of fleet
+    size, unlike the pie grid which costs one render pass per vehicle.
+    """
+    biz = np.asarray(business, dtype=float)
+    com = np.asarray(commute, dtype=float)
+    totals = biz + com
+    with np.errstate(invalid="ignore", divide="ignore"):
+        biz_pct = np.where(totals > 0, biz / totals * 100, 0.0)
+        com_pct = np.where(totals > 0, com / totals * 100, 0.0)
+
+    fig, ax = plt.subplots(figsize=(8, max(3, 0.4 * len(vehicles))))
+    ax.barh(vehicles, biz_pct, label="Business")
+    ax.barh(vehicles, com_pct, left=biz_pct, label="Commute")
+    ax.set_xlabel("% of miles")
+    ax.set_xlim(0, 100)
+    ax.invert_yaxis()  # first vehicle on top
+    ax.legend(loc="lower right")
+    fig.tight_layout()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=100)
+    plt.close(fig)
+    return buf.getvalue()
+
+
+@st.cache_data(show_spinner=False)
+def _pies_png(vehicles: tuple, business: tuple, commute: tuple) -> bytes:
+    """Render the per-vehicle Commute vs Business pie grid to PNG bytes."""
+    num_vehicles = len(vehicles)
+
+    # Decide grid layout (3 columns, N rows)
+    cols = 3
+    rows = (num_vehicles + cols - 1) // cols  # ceiling division
+
+    fig, axes = plt.subplots(rows, cols, figsize=(cols * 4, rows * 4))
+
+    # axes can be a single Axes if rows*cols == 1
+    if rows * cols == 1:
+        axes = [axes]
+    else:
+        axes = axes.flatten()
+
+    labels = ["Business", "Commute"]
+
+    for i, ax in enumerate(axes[:num_vehicles]):
+        if business[i] + commute[i] <= 0:
+            ax.text(0.5, 0.5, "No data", ha="center", va="center")
+            ax.set_title(vehicles[i])
+            ax.axis("off")
+            continue
+
+        ax.pie(
+            (business[i], commute[i]),
+            labels=labels,
+            autopct="%1.1f%%",
+            startangle=90,
+        )
+        ax.set_title(vehicles[i])
+        ax.axis("equal")  # circular pies
+
+    # Turn off any unused axes (if grid bigger than number of vehicles)
+    for ax in axes[num_vehicles:]:
+        ax.axis("off")
 
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=100)
+    plt.close(fig)
+    return buf.getvalue()
 
 
 def main():
@@ -218,17 +467,23 @@ def main():
     # ---------------------------
     st.subheader("Export")
 
-    master_excel = build_master_excel(df, summary)
-
-    st.download_button(
-        label="📥 Download full master Excel report (all drivers, all vehicles)",
-        data=master_excel,
-        file_name="mileage_report.xlsx",
-        mime=(
-            "application/vnd.openxmlformats-officedocument."
-            "spreadsheetml.sheet"
-        ),
-    )
+    # Don't serialize the workbook on every rerun — only build it once the
+    # user actually asks for a report. The bytes are stashed in
+    # session_state because st.download_button evaluates `data` eagerly.
+    with st.expander("Generate Excel report"):
+        if st.button("Build report"):
+            st.session_state["report_bytes"] = build_master_excel(df, summary)
+
+        if "report_bytes" in st.session_state:
+            st.download_button(
+                label="📥 Download full master Excel report (all drivers, all vehicles)",
+                data=st.session_state["report_bytes"],
+                file_name="mileage_report.xlsx",
+                mime=(
+                    "application/vnd.openxmlformats-officedocument."
+                    "spreadsheetml.sheet"
+                ),
+            )
 
     # ---------------------------
     # Sidebar: basic info + filters
@@ -250,13 +505,16 @@ def main():
         "Filter by driver:", driver_list, default=driver_list
     )
 
-    # Apply driver filter to the prepared dataframe
-    df_filtered = df.copy()
-    if selected_drivers and "Driver" in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered["Driver"].isin(selected_drivers)]
+    # Apply driver filter to the prepared dataframe. No defensive copy
+    # needed: the boolean mask already produces a new frame, and the
+    # unfiltered branch is only ever read downstream.
+    if selected_drivers and "Driver" in df.columns:
+        df_filtered = df[df["Driver"].isin(selected_drivers)]
+    else:
+        df_filtered = df
 
-    # Recompute summary based on driver-filtered data
-    summary_driver = mp.aggregate_by_vehicle(df_filtered)
+    # Recompute summary based on driver-filtered data (cached per selection)
+    summary_driver = _aggregate_filtered(df, tuple(sorted(selected_drivers)))
 
     # --- Vehicle filter (based on driver-filtered summary) ---
     vehicles = sorted(summary_driver.index.tolist())
@@ -270,14 +528,15 @@ def main():
         filtered_summary = summary_driver
 
 
-    # Rename columns for display (match your CSV header style)
-    summary_display = filtered_summary.rename(
-        columns={
-            "Commute_Miles": "Commute Miles",
-            "Business_Miles": "Business Miles",
-            "Total_Miles": "Total Miles",
-        }
-    ).round(2)
+    # Build the display frame (CSV-style headers) in one shot: round just
+    # the three numeric columns as a NumPy array instead of round+rename
+    # passes over the whole frame.
+    mile_cols = ["Business_Miles", "Commute_Miles", "Total_Miles"]
+    summary_display = pd.DataFrame(
+        np.round(filtered_summary[mile_cols].to_numpy(), 2),
+        index=filtered_summary.index,
+        columns=[DISPLAY_RENAME[c] for c in mile_cols],
+    )
 
     # ---------------------------
     # Top-level metrics
@@ -310,62 +569,31 @@ def main():
     # 1) Total miles bar chart
     with chart_col1:
         st.markdown("**Total Miles by Vehicle**")
-        fig1, ax1 = plt.subplots()
-        ax1.bar(summary_display.index, summary_display["Total Miles"])
-        ax1.set_ylabel("Miles")
-        ax1.set_xlabel("Vehicle")
-        ax1.set_title("Total Miles by Vehicle")
-        plt.xticks(rotation=30, ha="right")
-        st.pyplot(fig1)
+        st.image(_bar_png(
+            tuple(filtered_summary.index),
+            tuple(filtered_summary["Total_Miles"].round(2)),
+        ))
 
 
 
-    # --- 2) Pie charts: Commute vs Business miles for each vehicle ---
-    st.markdown("**Commute vs Business Miles by Vehicle (Pie Charts)**")
+    # --- 2) Commute vs Business miles for each vehicle ---
+    st.markdown("**Commute vs Business Miles by Vehicle**")
 
     num_vehicles = len(filtered_summary)
     if num_vehicles > 0:
-        # Decide grid layout (3 columns, N rows)
-        cols = 3
-        rows = (num_vehicles + cols - 1) // cols  # ceiling division
-
-        fig, axes = plt.subplots(rows, cols, figsize=(cols * 4, rows * 4))
-
-        # axes can be a single Axes if rows*cols == 1
-        if rows * cols == 1:
-            axes = [axes]
+        # Default view is a single stacked bar (one draw call for the whole
+        # fleet); the per-vehicle pie grid stays available behind a toggle.
+        chart_args = (
+            tuple(filtered_summary.index),
+            tuple(filtered_summary["Business_Miles"]),
+            tuple(filtered_summary["Commute_Miles"]),
+        )
+        if st.checkbox("Show pie per vehicle", value=False):
+            st.image(_pies_png(*chart_args))
         else:
-            axes = axes.flatten()
-
-        labels = ["Business", "Commute"]
-
-        for ax, (vehicle, row) in zip(axes, filtered_summary.iterrows()):
-            values = [row["Business_Miles"], row["Commute_Miles"]]
-            total = sum(values)
-
-            if total <= 0:
-                ax.text(0.5, 0.5, "No data", ha="center", va="center")
-                ax.set_title(vehicle)
-                ax.axis("off")
-                continue
-
-            ax.pie(
-                values,
-                labels=labels,
-                autopct="%1.1f%%",
-                startangle=90,
-            )
-            ax.set_title(vehicle)
-            ax.axis("equal")  # circular pies
-
-        # Turn off any unused axes (if grid bigger than number of vehicles)
-        for ax in axes[num_vehicles:]:
-            ax.axis("off")
-
-        fig.tight_layout()
-        st.pyplot(fig)
+            st.image(_stacked_png(*chart_args))
     else:
-        st.info("No vehicles selected for pie charts.")
+        st.info("No vehicles selected for the commute/business chart.")
 
     # ---------------------------
     # Details / Data quality section
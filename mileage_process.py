@@ -17,36 +17,74 @@ Mileage Processor (Multi-file, Payroll Logs Style)
 - Aggregates by vehicle and writes:
     - mileage_outputs/mileage_summary.csv
       Columns: Vehicle, Commute Miles, Business Miles, Total Miles
-    - mileage_outputs/mileage_summary_table.png (pretty table image)
+    - mileage_outputs/mileage_summary_table.html (pretty styled table;
+      set MILEAGE_TABLE_PNG=1 for an imgkit-rendered PNG as well)
     - mileage_outputs/commute_vs_business.png (stacked bar chart)
     - mileage_outputs/total_miles.png (total miles bar chart)
     - mileage_outputs/mileage_report.xlsx (Summary + Details sheets)
     - mileage_outputs/rows_with_issues.csv (rows with NaN or negative miles)
 """
 
+import argparse
+import concurrent.futures
+import os
 from pathlib import Path
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pacsv
+import matplotlib
+matplotlib.use("Agg")  # headless PNG rendering; faster than GUI backends
 import matplotlib.pyplot as plt
 
+# numba is optional: when present, aggregation runs through a JIT-compiled
+# kernel; otherwise we fall back to the plain pandas path.
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 # Canonical column names we use internally
 VEHICLE_COL = "Vehicle"
 BEGIN_COL   = "Start Mileage"
 END_COL     = "End Mileage"
 TYPE_COL    = "Mileage Type"
 
+# Every accepted header spelling -> its canonical name. rename() ignores
+# keys that aren't present, so one unconditional rename covers all inputs.
+_CANONICAL_RENAME = {
+    "Vehicle": VEHICLE_COL,
+    "Vehicle Used": VEHICLE_COL,
+    "Start Mileage": BEGIN_COL,
+    "End Mileage": END_COL,
+    "Mileage Type": TYPE_COL,
+}
+
 
 def pick_input_csvs():
     """
     Find ALL CSV files to use:
     - Prefer all files whose name contains 'Mileage' (e.g., '*Mileage*.csv')
     - If none found, use ALL '*.csv' files
+    One os.scandir pass collects both candidate lists, instead of the two
+    directory scans that back-to-back Path.glob calls would cost.
     """
-    mileage_candidates = sorted(Path(".").glob("*Mileage*.csv"))
+    mileage_candidates = []
+    csv_candidates = []
+    with os.scandir(".") as it:
+        for entry in it:
+            name = entry.name
+            if not name.endswith(".csv") or not entry.is_file():
+                continue
+            csv_candidates.append(name)
+            if "Mileage" in name:
+                mileage_candidates.append(name)
+
     if mileage_candidates:
-        candidates = mileage_candidates
+        candidates = [Path(n) for n in sorted(mileage_candidates)]
         print("📄 Using all CSV files matching '*Mileage*.csv':")
     else:
-        candidates = sorted(Path(".").glob("*.csv"))
+        candidates = [Path(n) for n in sorted(csv_candidates)]
         if not candidates:
             print("❌ No CSV file found in this folder. Place your mileage CSV(s) next to this script.")
             raise SystemExit(1)
@@ -58,26 +96,81 @@ def pick_input_csvs():
     return candidates
 
 
-def load_all_csvs(csv_paths):
+# Expected column types for the Arrow CSV reader. Declaring them up front
+# skips Arrow's type inference; both the clean and trailing-space header
+# variants are listed since the type mapping happens before we strip names.
+# The odometer columns are read as strings on purpose: a typed float64
+# read makes any non-numeric cell a fatal ArrowInvalid, whereas the
+# to_numeric(errors="coerce") pass in load_and_prepare turns it into NaN
+# so the row lands in rows_with_issues.csv like it always has.
+_ARROW_COLUMN_TYPES = {}
+for _name, _type in [
+    ("Vehicle", pa.string()),
+    ("Vehicle Used", pa.string()),
+    ("Mileage Type", pa.string()),
+    ("Start Mileage", pa.string()),
+    ("End Mileage", pa.string()),
+]:
+    _ARROW_COLUMN_TYPES[_name] = _type
+    _ARROW_COLUMN_TYPES[_name + " "] = _type
+
+# Columns the aggregation pipeline actually needs...
+_PIPELINE_COLUMNS = {"Vehicle", "Vehicle Used", "Start Mileage", "End Mileage", "Mileage Type"}
+# ...plus the ones carried along purely for the Details sheet.
+_DETAIL_COLUMNS = {"Date", "Total Mileage"}
+
+
+def load_all_csvs(csv_paths, summary_only=False):
     """
-    Load and concatenate all given CSV files.
+    Load and concatenate all given CSV files using pyarrow's CSV reader
+    (parallel C++ parse, no per-file Python dtype inference).
     Adds a 'Source File' column so we know where each row came from.
     Also strips whitespace from column names.
+    Concatenates on the Arrow side and converts to pandas once.
+
+    Only known columns are parsed at all — Arrow skips the rest. With
+    summary_only=True the Details-sheet pass-throughs (Date, Total
+    Mileage) are skipped too, leaving just the four pipeline columns.
     """
-    dfs = []
-    for p in csv_paths:
-        print(f"📥 Loading: {p.name}")
-        df = pd.read_csv(p)
+    wanted = set(_PIPELINE_COLUMNS)
+    if not summary_only:
+        wanted |= _DETAIL_COLUMNS
 
-        # Add source file name
-        df["Source File"] = p.name
+    def _read_table(p):
+        print(f"📥 Loading: {p.name}")
+        # Header-only peek to learn this file's exact column spellings
+        # (trailing spaces included), then project to the wanted ones.
+        header = pd.read_csv(p, nrows=0).columns
+        table = pacsv.read_csv(
+            p,
+            read_options=pacsv.ReadOptions(use_threads=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types=_ARROW_COLUMN_TYPES,
+                strings_can_be_null=True,
+                include_columns=[c for c in header if c.strip() in wanted],
+            ),
+        )
 
         # Strip whitespace from column names ("Vehicle " -> "Vehicle")
-        df.columns = df.columns.str.strip()
-
-        dfs.append(df)
+        return table.rename_columns([c.strip() for c in table.column_names])
+
+    # Read the files concurrently — the Arrow parser runs outside the GIL,
+    # so threads overlap disk I/O and parsing across files. executor.map
+    # preserves input order, keeping Source File assignment below aligned.
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(8, len(csv_paths))
+    ) as executor:
+        tables = list(executor.map(_read_table, csv_paths))
+    lengths = [table.num_rows for table in tables]
+
+    combined = pa.concat_tables(tables, promote_options="permissive").to_pandas()
+
+    # Add source file names in one shot after concat: a single np.repeat
+    # write instead of materializing a per-file name column in every table.
+    combined["Source File"] = np.repeat(
+        np.array([p.name for p in csv_paths], dtype=object), lengths
+    )
 
-    combined = pd.concat(dfs, ignore_index=True)
     print(f"📊 Combined {len(csv_paths)} file(s) into {len(combined)} total rows.")
     return combined
 
@@ -91,28 +184,18 @@ def normalize_column_names(df: pd.DataFrame) -> pd.DataFrame:
       - 'Mileage Type' -> 'Mileage Type'
     Assumes df.columns already had whitespace stripped.
     """
-    col_map = {}
-
-    # Vehicle column
-    if "Vehicle" in df.columns:
-        col_map["Vehicle"] = VEHICLE_COL
-    elif "Vehicle Used" in df.columns:
-        col_map["Vehicle Used"] = VEHICLE_COL
-
-    # Start Mileage
-    if "Start Mileage" in df.columns:
-        col_map["Start Mileage"] = BEGIN_COL
-
-    # End Mileage
-    if "End Mileage" in df.columns:
-        col_map["End Mileage"] = END_COL
-
-    # Mileage Type
-    if "Mileage Type" in df.columns:
-        col_map["Mileage Type"] = TYPE_COL
-
-    # Apply renames
-    df = df.rename(columns=col_map)
+    # A file set can mix the 'Vehicle' and 'Vehicle Used' spellings, in
+    # which case the permissive concat leaves BOTH columns (each null
+    # where the other file supplied the name). Coalesce them first so the
+    # rename below never produces two 'Vehicle' columns.
+    if "Vehicle Used" in df.columns and VEHICLE_COL in df.columns:
+        df = df.assign(
+            **{VEHICLE_COL: df[VEHICLE_COL].fillna(df["Vehicle Used"])}
+        ).drop(columns=["Vehicle Used"])
+
+    # One static mapping instead of rebuilding a per-call dict with
+    # membership checks; rename only touches columns that exist.
+    df = df.rename(columns=_CANONICAL_RENAME)
 
     # Check that required columns exist
     expected = [VEHICLE_COL, BEGIN_COL, END_COL, TYPE_COL]
@@ -125,6 +208,28 @@ def normalize_column_names(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+if njit is not None:
+    @njit(cache=True)
+    def _compute_miles(begin, end):
+        """Fused End−Start difference + validity flag in a single pass."""
+        n = begin.size
+        miles = np.empty(n)
+        ok = np.empty(n, dtype=np.bool_)
+        for i in range(n):
+            m = end[i] - begin[i]
+            miles[i] = m
+            ok[i] = (m == m) and (m >= 0.0)  # m != m only for NaN
+        return miles, ok
+
+    @njit(cache=True)
+    def _sum_miles_by_code(codes, commute, miles, n_vehicles):
+        """Accumulate miles into a (n_vehicles, 2) Business/Commute table."""
+        out = np.zeros((n_vehicles, 2))
+        for i in range(codes.size):
+            out[codes[i], 1 if commute[i] else 0] += miles[i]
+        return out
+
+
 def load_and_prepare(df: pd.DataFrame) -> pd.DataFrame:
     """
     - Normalizes column names
@@ -137,26 +242,48 @@ def load_and_prepare(df: pd.DataFrame) -> pd.DataFrame:
     # Normalize the various header names to our canonical ones
     df = normalize_column_names(df)
 
-    # 🔧 Normalize vehicle names so "jim", " Jim ", "JIM" → "Jim"
-    df[VEHICLE_COL] = (
-        df[VEHICLE_COL]
-        .astype(str)      # ensure string
-        .str.strip()      # remove leading/trailing spaces
-        .str.title()      # capitalize like "Jim", "Emily", etc.
-    )
-
-    # Ensure numeric odometers
-    df[BEGIN_COL] = pd.to_numeric(df[BEGIN_COL], errors="coerce")
-    df[END_COL]   = pd.to_numeric(df[END_COL], errors="coerce")
+    # 🔧 Normalize vehicle names so "jim", " Jim ", "JIM" → "Jim".
+    # Only the unique spellings get strip/title-cased (a handful of
+    # vehicles), then the results fan back out through the inverse index —
+    # instead of three string passes over every row.
+    raw_names = df[VEHICLE_COL].astype(str).to_numpy()
+    uniques, inverse = np.unique(raw_names, return_inverse=True)
+    normalized = np.array([name.strip().title() for name in uniques], dtype=object)
+    df[VEHICLE_COL] = normalized[inverse]
+
+    # Ensure numeric odometers. errors="coerce" is what quarantines rows
+    # with junk like 'unknown': the cell becomes NaN here and the row is
+    # flagged below. The dtype guard skips the pass when a caller already
+    # delivers numeric columns.
+    for col in (BEGIN_COL, END_COL):
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
 
     # Compute miles from odometers (ignore existing 'Total Mileage' field)
-    df["Miles"] = df[END_COL] - df[BEGIN_COL]
-
-    # Mark problems but don't fix them
-    df["_row_ok"] = df["Miles"].notna() & (df["Miles"] >= 0)
-
-    # Commute flag
-    df["_is_commute"] = df[TYPE_COL].astype(str).str.contains("commute", case=False, na=False)
+    # and mark problem rows without fixing them. With numba, the difference
+    # and the NaN/negative check run fused in one pass instead of three
+    # vectorized passes with intermediate arrays.
+    if njit is not None:
+        miles, ok = _compute_miles(
+            df[BEGIN_COL].to_numpy(np.float64),
+            df[END_COL].to_numpy(np.float64),
+        )
+        df["Miles"] = miles
+        df["_row_ok"] = ok
+    else:
+        df["Miles"] = df[END_COL] - df[BEGIN_COL]
+        df["_row_ok"] = df["Miles"].notna() & (df["Miles"] >= 0)
+
+    # Commute flag. The Mileage Type vocabulary is tiny, so run the
+    # 'commute' substring test once per distinct value (on the category
+    # table) and fan the answers back out through the integer codes,
+    # instead of regex-matching every row.
+    type_cat = df[TYPE_COL].astype(str).astype("category")
+    commute_cats = np.asarray(
+        type_cat.cat.categories.str.contains("commute", case=False, na=False)
+    )
+    codes = type_cat.cat.codes.to_numpy()
+    df["_is_commute"] = np.where(codes >= 0, commute_cats[codes], False)
 
     # Base columns we always want in some order
     cols = [VEHICLE_COL, BEGIN_COL, END_COL, TYPE_COL, "Miles", "_is_commute", "_row_ok"]
@@ -177,20 +304,31 @@ def aggregate_by_vehicle(df: pd.DataFrame) -> pd.DataFrame:
     Aggregates valid rows by vehicle and commute/business classification.
     """
     # Use only valid rows
-    ok = df[df["_row_ok"]].copy()
-
-    # Group by Vehicle + commute flag and sum miles
-    grp = ok.groupby([VEHICLE_COL, "_is_commute"])["Miles"].sum().reset_index()
-
-    # Pivot to get columns for Business vs Commute
-    pivot = grp.pivot(index=VEHICLE_COL, columns="_is_commute", values="Miles").fillna(0.0)
-    pivot = pivot.rename(columns={False: "Business_Miles", True: "Commute_Miles"})
-
-    # Ensure both columns exist
-    if "Business_Miles" not in pivot.columns:
-        pivot["Business_Miles"] = 0.0
-    if "Commute_Miles" not in pivot.columns:
-        pivot["Commute_Miles"] = 0.0
+    ok = df[df["_row_ok"]]
+
+    # Factorize the vehicle names once (sort=True keeps the output in
+    # vehicle order); both grouped-sum paths below work on the codes.
+    codes, uniques = pd.factorize(ok[VEHICLE_COL].to_numpy(), sort=True)
+    commute = ok["_is_commute"].to_numpy(np.bool_)
+    miles = ok["Miles"].to_numpy(np.float64)
+
+    if njit is not None:
+        # One compiled pass — no groupby sort, no pivot reshape.
+        sums = _sum_miles_by_code(
+            codes.astype(np.int64), commute, miles, len(uniques)
+        )
+    else:
+        # Same grouped sum in pure NumPy: fold the commute flag into the
+        # low bit of the key so np.bincount accumulates both Business and
+        # Commute totals in a single C pass.
+        key = codes * 2 + commute.astype(np.int64)
+        sums = np.bincount(
+            key, weights=miles, minlength=len(uniques) * 2
+        ).reshape(-1, 2)
+
+    pivot = pd.DataFrame(
+        sums, index=uniques, columns=["Business_Miles", "Commute_Miles"]
+    )
 
     # Total
     pivot["Total_Miles"] = pivot["Business_Miles"] + pivot["Commute_Miles"]
@@ -198,12 +336,77 @@ def aggregate_by_vehicle(df: pd.DataFrame) -> pd.DataFrame:
     # Name the index for nicer CSV header
     pivot.index.name = "Vehicle"
 
-    # Sort by vehicle name
-    pivot = pivot.sort_index()
-
     return pivot
 
 
+def summarize_with_duckdb(csv_paths):
+    """
+    Compute the per-vehicle summary with one DuckDB query straight over
+    the input CSVs (vectorized, multi-threaded, streaming — the frame
+    never has to exist in pandas). Mirrors load_and_prepare +
+    aggregate_by_vehicle semantics for the summary: trimmed/title-cased
+    vehicle names, rows with missing or negative miles excluded, commute
+    classified by a case-insensitive 'commute' substring.
+
+    Only used for the summary; the Details/issues outputs still come from
+    the pandas frame. Raises if duckdb is unavailable — the caller is
+    expected to fall back to aggregate_by_vehicle.
+    """
+    import duckdb
+
+    files = ", ".join("'{}'".format(str(p).replace("'", "''")) for p in csv_paths)
+
+    # union_by_name leaves 'vehicle' NULL for rows from files that use the
+    # 'Vehicle Used' spelling, so pick the vehicle expression from the
+    # headers actually present (mirroring normalize_column_names).
+    headers = set()
+    for p in csv_paths:
+        headers.update(c.strip() for c in pd.read_csv(p, nrows=0).columns)
+    if "Vehicle Used" not in headers:
+        vehicle_expr = "vehicle"
+    elif "Vehicle" in headers:
+        vehicle_expr = "COALESCE(vehicle, vehicle_used)"
+    else:
+        vehicle_expr = "vehicle_used"
+
+    # normalize_names collapses the header variants ("Vehicle ", "Start
+    # Mileage ") onto clean lowercase identifiers, mirroring our strip step.
+    # Title-case each space-separated word, matching str.title() in
+    # load_and_prepare so both paths produce the same group keys.
+    # (duckdb has no initcap; punctuation-adjacent letters would diverge,
+    # but vehicle names here are plain words.)
+    query = f"""
+        SELECT
+            array_to_string(
+                list_transform(
+                    string_split(TRIM(vehicle), ' '),
+                    w -> UPPER(SUBSTR(w, 1, 1)) || LOWER(SUBSTR(w, 2))
+                ), ' ') AS "Vehicle",
+            SUM(CASE WHEN COALESCE(LOWER(mileage_type), '') NOT LIKE '%commute%'
+                     THEN end_mileage - start_mileage ELSE 0 END) AS "Business_Miles",
+            SUM(CASE WHEN COALESCE(LOWER(mileage_type), '') LIKE '%commute%'
+                     THEN end_mileage - start_mileage ELSE 0 END) AS "Commute_Miles"
+        FROM (
+            -- TRY_CAST mirrors to_numeric(errors='coerce'): non-numeric
+            -- odometer cells become NULL and the row is excluded below.
+            SELECT
+                {vehicle_expr} AS vehicle,
+                mileage_type,
+                TRY_CAST(start_mileage AS DOUBLE) AS start_mileage,
+                TRY_CAST(end_mileage AS DOUBLE) AS end_mileage
+            FROM read_csv_auto([{files}], union_by_name=true, normalize_names=true)
+        )
+        WHERE start_mileage IS NOT NULL
+          AND end_mileage IS NOT NULL
+          AND end_mileage - start_mileage >= 0
+        GROUP BY 1
+        ORDER BY 1
+    """
+    summary = duckdb.connect().execute(query).df().set_index("Vehicle")
+    summary["Total_Miles"] = summary["Business_Miles"] + summary["Commute_Miles"]
+    return summary
+
+
 def save_outputs(df: pd.DataFrame, summary: pd.DataFrame, outdir: Path):
     outdir.mkdir(exist_ok=True, parents=True)
 
@@ -222,110 +425,101 @@ def save_outputs(df: pd.DataFrame, summary: pd.DataFrame, outdir: Path):
     summary_export.to_csv(summary_csv)
     print(f"✅ Wrote summary CSV: {summary_csv}")
 
-    # --- 2) Summary table image ---
-    table_png = outdir / "mileage_summary_table.png"
+    # --- 2) Summary table (styled HTML; optional PNG via imgkit) ---
 
     # Convert index → column for proper header
     summary_table = summary_export.round(2).reset_index()
     summary_table = summary_table.rename(columns={summary_table.columns[0]: "Vehicle"})
 
-    fig, ax = plt.subplots(figsize=(8, len(summary_table) * 0.6 + 1))
-    ax.axis("off")
-
-    # Create the table
-    tbl = ax.table(
-        cellText=summary_table.values,
-        colLabels=summary_table.columns,
-        loc="center",
-        cellLoc="center",
-    )
-
-    tbl.auto_set_font_size(False)
-    tbl.set_fontsize(10)
-    tbl.scale(1, 1.4)
-
-    # -----------------------------
-    #  BOLD + YELLOW HEADER ONLY
-    # -----------------------------
-    header_color = "#fff2a8"  # soft yellow
-
-    for (row, col), cell in tbl.get_celld().items():
-        if row == 0:  # header row
-            cell.set_text_props(weight="bold")
-            cell.set_facecolor(header_color)
-        else:
-            cell.set_facecolor("white")  # ensure other rows stay white
-
-    # Title & save
-    plt.title("Mileage Summary by Vehicle", pad=20)
-    fig.tight_layout()
-    fig.savefig(table_png, dpi=200)
-    plt.close(fig)
-
-    print(f"✅ Wrote summary table image: {table_png}")
-
-   # --- 3) Pie charts: Commute vs Business miles for each vehicle ---
+    # pandas' Styler renders the whole table in one pass, unlike the old
+    # matplotlib table artist, which laid out every cell in Python and
+    # crawled past a few dozen vehicles.
+    styled = summary_table.style.hide(axis="index").set_table_styles(
+        [
+            {
+                "selector": "th",
+                "props": "background-color: #fff2a8; font-weight: bold;",
+            }
+        ]
+    ).set_caption("Mileage Summary by Vehicle")
+
+    table_html = outdir / "mileage_summary_table.html"
+    table_html.write_text(styled.to_html())
+    print(f"✅ Wrote summary table: {table_html}")
+
+    # Opt-in PNG render of the same HTML; needs imgkit (plus wkhtmltoimage
+    # on the PATH). The HTML above is the canonical output either way.
+    if os.environ.get("MILEAGE_TABLE_PNG"):
+        try:
+            import imgkit
+
+            table_png = outdir / "mileage_summary_table.png"
+            imgkit.from_string(styled.to_html(), str(table_png))
+            print(f"✅ Wrote summary table image: {table_png}")
+        except Exception as e:
+            print(f"⚠ Could not render table PNG ({e}); HTML is still there.")
+
+    # One reusable figure for all the charts: clear it between charts
+    # instead of allocating (and re-initializing backend state for) a new
+    # figure per output.
+    fig = plt.figure()
+
+    # --- 3) Commute vs Business miles: one stacked horizontal bar chart ---
+    # A single barh pair replaces the old per-vehicle pie grid: one draw
+    # call regardless of fleet size (each ax.pie was its own Python-level
+    # wedge/label layout), and side-by-side bars compare better anyway.
     num_vehicles = len(summary.index)
 
-    # Determine subplot layout (e.g., 1x3, 2x3, etc.)
-    cols = 3
-    rows = (num_vehicles + cols - 1) // cols  # ceiling division
-
-    fig, axes = plt.subplots(rows, cols, figsize=(cols * 4, rows * 4))
-    axes = axes.flatten()
-
-    labels = ["Business", "Commute"]
-    colors = ["#4c72b0", "#55a868"]  # optional colors
-
-    for ax, (vehicle, row) in zip(axes, summary.iterrows()):
-        values = [row["Business_Miles"], row["Commute_Miles"]]
-
-        ax.pie(
-            values,
-            labels=labels,
-            autopct="%1.1f%%",
-            startangle=90,
-            colors=colors,
-        )
-        ax.set_title(vehicle)
-
-    # Turn off any unused subplots
-    for ax in axes[num_vehicles:]:
-        ax.axis("off")
-
-    plt.suptitle("Commute vs Business Miles by Vehicle (Pie Charts)", fontsize=16, y=1.02)
+    fig.set_size_inches(10, 0.4 * num_vehicles + 1.5)
+    ax = fig.subplots()
+    y = np.arange(num_vehicles)
+    # Pull each column out once as a NumPy array; Business in particular
+    # was being extracted twice (bar data + the Commute offset).
+    business = summary["Business_Miles"].to_numpy()
+    commute = summary["Commute_Miles"].to_numpy()
+    ax.barh(y, business, color="#4c72b0", label="Business")
+    ax.barh(y, commute, left=business, color="#55a868", label="Commute")
+    ax.set_yticks(y)
+    ax.set_yticklabels(summary.index)
+    ax.invert_yaxis()  # first vehicle on top
+    ax.set_xlabel("Miles")
+    ax.set_title("Commute vs Business Miles by Vehicle")
+    ax.legend()
     fig.tight_layout()
 
-    pie_png = outdir / "vehicle_pies.png"
-    fig.savefig(pie_png, dpi=150, bbox_inches="tight")
-    plt.close(fig)
+    bar_png = outdir / "commute_vs_business.png"
+    fig.savefig(bar_png, dpi=150)
+    fig.clear()
 
-    print(f"✅ Wrote pie chart grid: {pie_png}")
+    print(f"✅ Wrote commute vs business chart: {bar_png}")
 
     # --- 4) Total miles chart ---
     idx = range(len(summary.index))
 
-
-    fig2 = plt.figure()
-    plt.bar(idx, summary["Total_Miles"].values)
-    plt.xticks(idx, summary.index, rotation=0)
-    plt.ylabel("Miles")
-    plt.title("Total Miles by Vehicle")
-    fig2.tight_layout()
+    fig.set_size_inches(6.4, 4.8)  # back to matplotlib's default size
+    ax = fig.subplots()
+    ax.bar(idx, summary["Total_Miles"].values)
+    ax.set_xticks(idx, summary.index, rotation=0)
+    ax.set_ylabel("Miles")
+    ax.set_title("Total Miles by Vehicle")
+    fig.tight_layout()
     total_png = outdir / "total_miles.png"
-    fig2.savefig(total_png, dpi=150)
-    plt.close(fig2)
+    fig.savefig(total_png, dpi=150)
+    plt.close(fig)
     print(f"✅ Wrote chart: {total_png}")
 
     # --- 5) Excel workbook: Summary + Details (no per-vehicle sheets) ---
     xlsx_path = outdir / "mileage_report.xlsx"
+    # No constant_memory here: pandas' to_excel emits cells column by
+    # column, and constant_memory mode silently drops writes to any row
+    # it has already flushed — which guts every column after the first.
     with pd.ExcelWriter(xlsx_path, engine="xlsxwriter") as writer:
         # Summary sheet
         summary_export.reset_index().to_excel(writer, sheet_name="Summary", index=False)
 
-        # Details sheet with all rows
-        details_view = df.copy()
-        details_view = details_view.rename(
+        # Details sheet with all rows. rename() already returns a new
+        # frame, so no explicit copy of every block is needed first.
+        details_view = df.rename(
             columns={
                 "_is_commute": "Is_Commute",
                 "_row_ok": "Row_OK",
@@ -336,28 +530,48 @@ def save_outputs(df: pd.DataFrame, summary: pd.DataFrame, outdir: Path):
     print(f"✅ Wrote Excel workbook: {xlsx_path}")
 
     # --- 6) Data-quality export (rows with NaN or negative miles) ---
-    bad = df[~df["_row_ok"]].copy()
+    # No .copy() — to_csv only reads the selection. chunksize caps the
+    # string buffer to 50k rows at a time on large inputs.
+    bad = df.loc[~df["_row_ok"]]
     if not bad.empty:
         bad_csv = outdir / "rows_with_issues.csv"
-        bad.to_csv(bad_csv, index=False)
+        bad.to_csv(bad_csv, index=False, chunksize=50_000)
         print(f"⚠ Found {len(bad)} row(s) with NaN or negative miles. See: {bad_csv}")
     else:
         print("✅ No row-level issues detected.")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Process payroll mileage CSV logs.")
+    parser.add_argument(
+        "--summary-only",
+        action="store_true",
+        help="skip parsing the Date/Total Mileage columns (faster when you "
+             "only need the summary, at the cost of a thinner Details sheet)",
+    )
+    args = parser.parse_args()
+
     # 1) Find ALL CSVs we care about
     csv_files = pick_input_csvs()
     outdir = Path("mileage_outputs")
 
     # 2) Load and combine them
-    raw_df = load_all_csvs(csv_files)
+    raw_df = load_all_csvs(csv_files, summary_only=args.summary_only)
 
     # 3) Prepare / classify
     df = load_and_prepare(raw_df)
 
-    # 4) Aggregate
-    summary = aggregate_by_vehicle(df)
+    # 4) Aggregate. MILEAGE_USE_DUCKDB=1 routes the summary through a
+    # single DuckDB query over the CSVs; any failure (including duckdb
+    # simply not being installed) falls back to in-process aggregation.
+    summary = None
+    if os.environ.get("MILEAGE_USE_DUCKDB"):
+        try:
+            summary = summarize_with_duckdb(csv_files)
+        except Exception as e:
+            print(f"⚠ DuckDB summary failed ({e}); using pandas aggregation.")
+    if summary is None:
+        summary = aggregate_by_vehicle(df)
 
     # 5) Save outputs
     save_outputs(df, summary, outdir)